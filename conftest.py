@@ -0,0 +1 @@
+# Makes the frequency_listener package importable when running plain pytest
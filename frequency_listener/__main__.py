@@ -2,10 +2,11 @@
 
 
 from .listener import Listener
-from .resources import BandwidthSize
+from .resources import BandwidthSize, Precision
 from .configuration import *
 
 
+import os
 import logging
 import argparse
 import configparser
@@ -16,14 +17,26 @@ logging.getLogger().setLevel(logging.INFO)
 if __name__ == "__main__":
     argparser = argparse.ArgumentParser(description="Frequecny listener")
     argparser.add_argument("-c", "--configuration-file", help="Path to configuration file, default frequency_listener.ini", action="store", default="frequency_listener.ini")
+    argparser.add_argument("-p", "--profile", help="Profile every pipeline stage and export results to the given directory, default profile", action="store", nargs="?", const="profile", default=None)
     args = argparser.parse_args()
 
     config = configparser.ConfigParser()
     config.read(args.configuration_file)
 
+    control_socket = None
+    if config.has_section("control") and config["control"].get("enable", "false") == "true":
+        control_socket = config["control"].get("socket_path", "frequency_listener.sock")
+
+    index_path = None
+    if config.has_section("index") and config["index"].get("enable", "false") == "true":
+        index_path = config["index"].get("path", os.path.join("output", "index.sqlite"))
+
     lc = ListenerConfiguration(
         duration_s=float(config["listener"].get("duration_s", 30)),
-        export=bool(config["exporter_configuration"]["enable"].lower() == "true")
+        export=bool(config["exporter_configuration"]["enable"].lower() == "true"),
+        profile_directory=args.profile,
+        control_socket=control_socket,
+        index_path=index_path,
     )
 
     bd = DemodulationType.FM
@@ -33,6 +46,8 @@ if __name__ == "__main__":
     if config["fm_demodulator_configuration"].get("bandwidth", "wide") == "broadcast":
         bw = BandwidthSize.BROADCAST
   
+    precision = Precision(config["listener"].get("precision", "single"))
+
     iqc = IQConfiguration()
     iqc.output_dir= config["iq"].get("output_dir", "output")
     if config["iq"].get("enable", "false") == "true":
@@ -45,6 +60,14 @@ if __name__ == "__main__":
         frequency_correction_ppm=float(config["device_configuration"].get("frequency_correction_ppm", 1)),
         read_chunk_size=int(config["device_configuration"].get("read_chunk_size", 2097152)),
         frequency_offset=float(config["device_configuration"].get("frequency_offset", 0.0)),
+        min_frequency=float(config["device_configuration"].get("min_frequency", 24e6)),
+        max_frequency=float(config["device_configuration"].get("max_frequency", 1766e6)),
+        drop_tolerance_s=float(config["device_configuration"].get("drop_tolerance_s", 0.1)),
+        adaptive_chunk_size=bool(config["device_configuration"].get("adaptive_chunk_size", "false") == "true"),
+        min_read_chunk_size=int(config["device_configuration"].get("min_read_chunk_size", 16384)),
+        max_read_chunk_size=int(config["device_configuration"].get("max_read_chunk_size", 4194304)),
+        target_load=float(config["device_configuration"].get("target_load", 0.5)),
+        precision=precision,
         bandwidth=bw,
         iq=iqc,
     )
@@ -58,17 +81,38 @@ if __name__ == "__main__":
         max_delay_s=max_delay_s,
         max_chunk_size_b=int(config["fm_demodulator_configuration"].get("max_chunk_size_b", 50000)),
         remove_ctcss=bool(config["fm_demodulator_configuration"].get("remove_ctcss", "false").lower()=="true"),
+        detect_ctcss=bool(config["fm_demodulator_configuration"].get("detect_ctcss", "false").lower()=="true"),
+        ctcss_tones=[float(tone) for tone in config["fm_demodulator_configuration"].get("ctcss_tones", "").split(",") if tone.strip()],
+        ctcss_threshold_db=float(config["fm_demodulator_configuration"].get("ctcss_threshold_db", 10.0)),
+        ctcss_min_power_ratio=float(config["fm_demodulator_configuration"].get("ctcss_min_power_ratio", 0.3)),
+        agc_attack_s=float(config["fm_demodulator_configuration"].get("agc_attack_s", 0.01)),
+        agc_decay_s=float(config["fm_demodulator_configuration"].get("agc_decay_s", 0.5)),
+        agc_target=float(config["fm_demodulator_configuration"].get("agc_target", 0.5)),
+        agc_limit=float(config["fm_demodulator_configuration"].get("agc_limit", 0.9)),
+        precision=precision,
     )
 
     sc = FileExporterConfiguration(
         output_directory=config["exporter_configuration"].get("output_directory", "output")
     )
 
+    nc = None
+    if config.has_section("network_exporter_configuration") and config["network_exporter_configuration"].get("enable", "false") == "true":
+        iq_port = config["network_exporter_configuration"].get("iq_port")
+        nc = NetworkExporterConfiguration(
+            protocol=config["network_exporter_configuration"].get("protocol", "tcp"),
+            host=config["network_exporter_configuration"].get("host", "127.0.0.1"),
+            audio_port=int(config["network_exporter_configuration"].get("audio_port", 7355)),
+            iq_port=int(iq_port) if iq_port else None,
+            udp_destinations=[host.strip() for host in config["network_exporter_configuration"].get("udp_destinations", "127.0.0.1").split(",")],
+        )
+
     listener = Listener(
         device_params=dc,
         demodulator_params=fc,
         exporter_params=sc,
-        configuration=lc
+        configuration=lc,
+        network_params=nc,
     )
     if listener.setup():
         listener.run()
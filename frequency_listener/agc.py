@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+
+import numpy as np
+
+class AGC:
+    """Streaming automatic gain control with peak limiter
+
+    The envelope is tracked on short frames with separate attack and decay
+    time constants, and the gain is interpolated per sample between frames.
+    State is carried over from one block to the next.
+    """
+    def __init__(self, rate:int, attack_s:float=0.01, decay_s:float=0.5, target:float=0.5, limit:float=0.9, max_gain:float=100.0, frame_s:float=0.01):
+        self._frame:int = max(1, int(rate * frame_s))
+        self._attack:float = np.exp(-frame_s / attack_s)
+        self._decay:float = np.exp(-frame_s / decay_s)
+        self._target:float = target
+        self._limit:float = limit
+        self._max_gain:float = max_gain
+        self.reset()
+
+    def reset(self) -> None:
+        self._envelope:float = 0.0
+        self._gain:float = 1.0
+
+    def process(self, x:np.array) -> np.array:
+        """Apply gain to a block of audio in a single pass"""
+        n:int = len(x)
+        if n == 0:
+            return x
+        magnitude = np.abs(x)
+        full:int = n // self._frame
+        peaks = magnitude[:full * self._frame].reshape(full, self._frame).max(axis=1)
+        ends = np.arange(1, full + 1) * self._frame - 1
+        if n % self._frame:
+            peaks = np.append(peaks, magnitude[full * self._frame:].max())
+            ends = np.append(ends, n - 1)
+
+        gains = np.empty(len(peaks))
+        envelope:float = self._envelope
+        for i, peak in enumerate(peaks):
+            coef = self._attack if peak > envelope else self._decay
+            envelope = coef * envelope + (1 - coef) * peak
+            gains[i] = min(self._target / max(envelope, 1e-12), self._max_gain)
+        self._envelope = envelope
+
+        # Ramp from the last gain of the previous block to avoid steps
+        gain = np.interp(np.arange(n), np.concatenate(([-1], ends)), np.concatenate(([self._gain], gains)))
+        self._gain = gains[-1]
+        return np.clip(x * gain.astype(x.dtype, copy=False), -self._limit, self._limit)
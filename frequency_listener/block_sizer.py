@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class BlockSizer:
+    """Adapt the device read size to the load of the processing stage
+
+    The load is the processing time of a block over its real-time duration.
+    Above target_load the read size is doubled to amortize per-block cost,
+    under half of it the read size is halved to lower latency.
+    """
+    def __init__(self, initial_size:int, min_size:int, max_size:int, target_load:float=0.5, min_reports:int=3, smoothing:float=0.3):
+        self._min_size:int = self._round(min_size)
+        self._max_size:int = max(self._round(max_size), self._min_size)
+        self._chunk_size:int = min(max(self._round(initial_size), self._min_size), self._max_size)
+        self._target_load:float = target_load
+        self._min_reports:int = min_reports
+        self._smoothing:float = smoothing
+        self._load:float = 0.0
+        self._reports:int = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _round(size:int) -> int:
+        # The device reads whole 512 samples packets
+        return max(512, int(size) // 512 * 512)
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    @property
+    def load(self) -> float:
+        return self._load
+
+    def report(self, n_samples:int, sample_rate:float, processing_s:float) -> None:
+        """Account for the processing time of a block"""
+        with self._lock:
+            if n_samples != self._chunk_size:
+                # Block read before the last change
+                return
+            load:float = processing_s / (n_samples / sample_rate)
+            self._load = load if self._reports == 0 else self._smoothing * load + (1 - self._smoothing) * self._load
+            self._reports += 1
+            if self._reports < self._min_reports:
+                return
+            size:int = self._chunk_size
+            if self._load > self._target_load:
+                size = min(self._chunk_size * 2, self._max_size)
+            elif self._load < self._target_load / 2:
+                size = max(self._round(self._chunk_size // 2), self._min_size)
+            if size == self._chunk_size:
+                return
+            logger.info(f"Load {self._load:.2f} vs target {self._target_load:.2f}, read size {self._chunk_size} -> {size} samples ({size / sample_rate:.3f} s)")
+            self._chunk_size = size
+            self._reports = 0
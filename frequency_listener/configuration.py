@@ -1,9 +1,9 @@
 #!/usr/bin/env python
 
-from typing import Union
-from dataclasses import dataclass
+from typing import Union, List
+from dataclasses import dataclass, field
 
-from .resources import DemodulationType, BandwidthSize
+from .resources import DemodulationType, BandwidthSize, Precision
 
 @dataclass
 class ExporterConfiguration:
@@ -13,6 +13,16 @@ class ExporterConfiguration:
 class FileExporterConfiguration(ExporterConfiguration):
     output_directory:str = "output"
 
+@dataclass
+class NetworkExporterConfiguration(ExporterConfiguration):
+    output_type:str = "network"
+    protocol:str = "tcp"
+    host:str = "127.0.0.1"
+    audio_port:int = 7355
+    iq_port:Union[int, None] = None
+    udp_destinations:List[str] = field(default_factory=lambda: ["127.0.0.1"])
+    udp_payload_size:int = 1472
+
 @dataclass
 class IQConfiguration:
     record:bool = False
@@ -28,8 +38,16 @@ class DeviceConfiguration:
     frequency_correction_ppm: float=20.0
     read_chunk_size: int=4096
     frequency_offset: float=0.0
+    min_frequency: float=24e6
+    max_frequency: float=1766e6
     bandwidth: BandwidthSize=BandwidthSize.WIDE
-    iq: IQConfiguration = IQConfiguration()
+    drop_tolerance_s: float=0.1
+    adaptive_chunk_size: bool=False
+    min_read_chunk_size: int=16384
+    max_read_chunk_size: int=4194304
+    target_load: float=0.5
+    precision: Precision=Precision.SINGLE
+    iq: IQConfiguration = field(default_factory=IQConfiguration)
 
 @dataclass
 class DemodulatorConfiguration:
@@ -41,8 +59,20 @@ class FMDemodulatorConfiguration(DemodulatorConfiguration):
     max_chunk_size_b: int=350000
     max_delay_s: int=300
     remove_ctcss: bool=False
+    detect_ctcss: bool=False
+    ctcss_tones: List[float] = field(default_factory=list)
+    ctcss_threshold_db: float=10.0
+    ctcss_min_power_ratio: float=0.3
+    agc_attack_s: float=0.01
+    agc_decay_s: float=0.5
+    agc_target: float=0.5
+    agc_limit: float=0.9
+    precision: Precision=Precision.SINGLE
 
 @dataclass
 class ListenerConfiguration:
     duration_s: float=10
     export: bool=True
+    profile_directory: Union[str, None] = None
+    control_socket: Union[str, None] = None
+    index_path: Union[str, None] = None
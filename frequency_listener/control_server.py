@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+import os
+import json
+import stat
+import socket
+import logging
+from typing import Callable, Dict, Any
+
+from .lf_thread import LFThread
+
+logger = logging.getLogger(__name__)
+
+class ControlServer(LFThread):
+    """Local Unix socket accepting one JSON command per line"""
+    def __init__(self, socket_path:str, handler:Callable[[Dict[str, Any]], Dict[str, Any]]):
+        super().__init__()
+        self._socket_path:str = socket_path
+        self._handler = handler
+        self._socket:socket.socket = None
+        self._timeout_s = 1
+
+    def _remove_socket(self) -> bool:
+        """Remove a stale socket, never any other kind of file"""
+        if not os.path.exists(self._socket_path):
+            return True
+        if not stat.S_ISSOCK(os.stat(self._socket_path).st_mode):
+            logger.error(f"Control socket path {self._socket_path} exists and is not a socket")
+            return False
+        os.unlink(self._socket_path)
+        return True
+
+    def setup(self) -> bool:
+        res:bool = False
+        if not self._remove_socket():
+            self._running = False
+            return res
+        try:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.bind(self._socket_path)
+            self._socket.listen()
+            self._socket.settimeout(self._timeout_s)
+        except Exception as e:
+            logger.error(f"Could not open control socket {self._socket_path}: {e}")
+            self._running = False
+        else:
+            logger.info(f"Control socket listening on {self._socket_path}")
+            res = True
+        return res
+
+    def handle_line(self, line:str) -> Dict[str, Any]:
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            return {"ok": False, "error": f"Invalid JSON: {e}"}
+        if not isinstance(request, dict) or "command" not in request:
+            return {"ok": False, "error": "Missing command"}
+        try:
+            return self._handler(request)
+        except Exception as e:
+            logger.error(f"Control command {request} failed: {e}")
+            return {"ok": False, "error": str(e)}
+
+    def serve(self, connection:socket.socket) -> None:
+        connection.settimeout(self._timeout_s)
+        buffer:bytes = b""
+        while self._running:
+            try:
+                chunk = connection.recv(4096)
+            except socket.timeout:
+                continue
+            if not chunk:
+                break
+            buffer += chunk
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                if not line.strip():
+                    continue
+                response = self.handle_line(line.decode())
+                connection.sendall(json.dumps(response).encode() + b"\n")
+
+    def run(self) -> None:
+        logger.info("Running control server")
+        while self._running:
+            try:
+                connection, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            with connection:
+                try:
+                    self.serve(connection)
+                except OSError as e:
+                    logger.warning(f"Control connection closed: {e}")
+
+    def quit(self) -> bool:
+        logger.info("Closing control server")
+        self._running = False
+        if self._socket is not None:
+            self._socket.close()
+            self._remove_socket()
+        return True
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+import numpy as np
+import scipy.signal as signal
+from typing import Dict, List, Tuple, Union
+
+# EIA/TIA-603 standard CTCSS tones in Hz
+CTCSS_TONES = np.array([
+    67.0, 69.3, 71.9, 74.4, 77.0, 79.7, 82.5, 85.4, 88.5, 91.5,
+    94.8, 97.4, 100.0, 103.5, 107.2, 110.9, 114.8, 118.8, 123.0, 127.3,
+    131.8, 136.5, 141.3, 146.2, 151.4, 156.7, 159.8, 162.2, 165.5, 167.9,
+    171.3, 173.8, 177.3, 179.9, 183.5, 186.2, 189.9, 192.8, 196.6, 199.5,
+    203.5, 206.5, 210.7, 218.1, 225.7, 229.1, 233.6, 241.8, 250.3, 254.1,
+])
+
+class CTCSSDetector:
+    """Identify the CTCSS tone of a discriminator output with a Goertzel filter bank
+
+    The discriminator output is decimated to a low rate in two filtered stages,
+    the last window_s seconds are kept across blocks and each standard tone
+    is measured with a Goertzel filter over that window. A tone is reported
+    when it stands out from the other tones and holds at least min_power_ratio
+    of the power below 300 Hz.
+    """
+    def __init__(self, threshold_db:float=10.0, min_power_ratio:float=0.3, detection_rate:int=1000, intermediate_rate:int=8000, window_s:float=1.0):
+        self._threshold:float = 10 ** (threshold_db / 10)
+        self._min_power_ratio:float = min_power_ratio
+        self._detection_rate:int = detection_rate
+        self._intermediate_rate:int = intermediate_rate
+        self._window_s:float = window_s
+        self._filters:Dict[int, Tuple[np.array, int, np.array, int]] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        self._zi:Union[List[np.array], None] = None
+        self._offsets:List[int] = [0, 0]
+        self._history:np.array = np.zeros(0)
+
+    def _design(self, sample_rate:int) -> Tuple[np.array, int, np.array, int]:
+        # Stage 1 keeps aliases of the intermediate rate out of the tone band
+        step1:int = max(1, sample_rate // self._intermediate_rate)
+        sos1 = signal.butter(6, 2000 / (sample_rate / 2), btype="low", output="sos")
+        # Stage 2 is sharp enough that audio above 300 Hz cannot alias onto a tone
+        rate1:float = sample_rate / step1
+        step2:int = max(1, int(rate1 // self._detection_rate))
+        sos2 = signal.ellip(8, 0.5, 80, 260 / (rate1 / 2), btype="low", output="sos")
+        return sos1, step1, sos2, step2
+
+    def _decimate(self, x:np.array, sample_rate:int) -> Tuple[np.array, float]:
+        if sample_rate not in self._filters:
+            self._filters[sample_rate] = self._design(sample_rate)
+        sos1, step1, sos2, step2 = self._filters[sample_rate]
+        sos1 = sos1.astype(x.dtype, copy=False)
+        if self._zi is None:
+            self._zi = [(signal.sosfilt_zi(sos1) * x[0]).astype(x.dtype), np.zeros((sos2.shape[0], 2))]
+        y, self._zi[0] = signal.sosfilt(sos1, x, zi=self._zi[0])
+        y = self._downsample(y, step1, 0)
+        # The low rate stage runs in double precision, its coefficients need it
+        y, self._zi[1] = signal.sosfilt(sos2, y.astype(np.float64), zi=self._zi[1])
+        y = self._downsample(y, step2, 1)
+        return y, sample_rate / step1 / step2
+
+    def _downsample(self, y:np.array, step:int, stage:int) -> np.array:
+        """Keep one sample every step, continuing the phase of the previous block"""
+        offset:int = self._offsets[stage]
+        self._offsets[stage] = (offset - len(y)) % step
+        return y[offset::step]
+
+    def goertzel(self, x:np.array, rate:float) -> np.array:
+        """Power of each standard tone in x"""
+        powers = np.empty(len(CTCSS_TONES))
+        for i, tone in enumerate(CTCSS_TONES):
+            coef = 2 * np.cos(2 * np.pi * tone / rate)
+            s = signal.lfilter([1.0], [1.0, -coef, 1.0], x)
+            powers[i] = s[-1] ** 2 + s[-2] ** 2 - coef * s[-1] * s[-2]
+        return powers
+
+    def detect(self, x:np.array, sample_rate:int) -> Union[float, None]:
+        """Return the tone present in the last window, or None"""
+        if len(x) == 0:
+            return None
+        y, rate = self._decimate(x, sample_rate)
+        window:int = int(rate * self._window_s)
+        self._history = np.concatenate((self._history, y))[-window:]
+        if len(self._history) < window:
+            return None
+        history = self._history - np.mean(self._history)
+        powers = self.goertzel(history, rate)
+        best:int = int(np.argmax(powers))
+        if powers[best] < self._threshold * max(np.median(powers), 1e-20):
+            return None
+        # A pure tone of amplitude A gives a Goertzel power of (A N / 2)^2 and an energy of A^2 N / 2
+        total:float = np.sum(history ** 2) * len(history) / 2
+        if powers[best] < self._min_power_ratio * total:
+            return None
+        return float(CTCSS_TONES[best])
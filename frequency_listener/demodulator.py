@@ -1,12 +1,15 @@
 #!/usr/bin/env python
 
+import queue
 import logging
 import numpy as np
+from typing import List
 import scipy.signal as signal
 
 from .lf_thread import LFThread
 from .configuration import DemodulatorConfiguration
 from .resources import BandwidthSize
+from .block_sizer import BlockSizer
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,25 @@ class Demodulator(LFThread):
     def __init__(self, configuration: DemodulatorConfiguration):
         super().__init__()
         self._configuration = configuration
+        self._block_sizer:BlockSizer = None
+        self._stream_queues:List[queue.Queue] = []
+        self._dropped_stream_blocks:int = 0
+
+    def set_block_sizer(self, block_sizer:BlockSizer) -> None:
+        self._block_sizer = block_sizer
+
+    def set_stream_queue(self, q:queue.Queue) -> None:
+        """Receive every demodulated block as soon as it is produced"""
+        self._stream_queues.append(q)
+
+    def publish_stream(self, data) -> None:
+        # Live consumers must never hold the demodulator back
+        for q in self._stream_queues:
+            try:
+                q.put_nowait(data)
+            except queue.Full:
+                self._dropped_stream_blocks += 1
+                logger.warning(f"Stream queue full, {self._dropped_stream_blocks} blocks dropped")
 
     def setup(self) -> bool:
         pass
@@ -23,6 +45,10 @@ class Demodulator(LFThread):
         logger.info("Closing demodulator")
         return self.teardown()
 
+    def set_snr_db(self, snr_db:float) -> None:
+        self._configuration.snr_db = snr_db
+        logger.info(f"SNR threshold set to {snr_db} dB")
+
     def snr_threshold(self, snr_db:float) -> bool:
         """tell if the current sample can be discarded or not"""
         return round(np.max(snr_db), 2) >= round(self._configuration.snr_db, 2)
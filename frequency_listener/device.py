@@ -1,17 +1,36 @@
 #!/usr/bin/env python
 
+import time
 import logging
+import threading
+from typing import Union, Dict, Any, Tuple, List
 from .configuration import DeviceConfiguration
+from .resources import BandwidthSize
+from .block_sizer import BlockSizer
 
 from .lf_thread import LFThread
 
 logger = logging.getLogger(__name__)
 
+class _RetuneRequest:
+    """Settings waiting to be applied by the device thread"""
+    def __init__(self, settings:Dict[str, Any]):
+        self.settings:Dict[str, Any] = settings
+        self.done = threading.Event()
+        self.error:Union[str, None] = None
+
 class Device(LFThread):
     """SDR device manager"""
     def __init__(self, configuration:DeviceConfiguration):
         super().__init__()
         self._configuration:DeviceConfiguration = configuration
+        self._settings_lock = threading.Lock()
+        self._pending_requests:List[_RetuneRequest] = []
+        self._start_epoch:Union[float, None] = None
+        self._start_monotonic:Union[float, None] = None
+        self._sample_count:int = 0
+        self._dropped_samples:int = 0
+        self._block_sizer:Union[BlockSizer, None] = None
 
     def setup(self) -> bool:
         """Setup the device"""
@@ -21,5 +40,90 @@ class Device(LFThread):
         """Teardown"""
         return True
 
+    def retune(self, center_frequency:Union[float, None]=None, bandwidth:Union[BandwidthSize, None]=None, gain:Union[str, float, None]=None, timeout_s:Union[float, None]=None) -> Tuple[bool, Union[str, None]]:
+        """Request new tuning of a running device and wait until it is applied before the next read
+
+        Return whether the settings were applied, and the error otherwise.
+        """
+        settings:Dict[str, Any] = {}
+        if center_frequency is not None:
+            settings["center_frequency"] = center_frequency
+        if bandwidth is not None:
+            settings["bandwidth"] = bandwidth
+        if gain is not None:
+            settings["gain"] = gain
+        request = _RetuneRequest(settings)
+        with self._settings_lock:
+            self._pending_requests.append(request)
+        if not request.done.wait(timeout_s):
+            with self._settings_lock:
+                if request in self._pending_requests:
+                    self._pending_requests.remove(request)
+                    return False, "Device did not apply the settings in time"
+            # Being applied right now
+            request.done.wait()
+        return request.error is None, request.error
+
+    def apply_settings(self) -> None:
+        """Push the current configuration to the hardware"""
+        pass
+
+    def recover_settings(self) -> None:
+        """Push the configuration back to the hardware after a failed retune"""
+        self.apply_settings()
+
+    def apply_pending_settings(self) -> None:
+        with self._settings_lock:
+            requests, self._pending_requests = self._pending_requests, []
+        for request in requests:
+            previous:Dict[str, Any] = {name: getattr(self._configuration, name) for name in request.settings}
+            for name, value in request.settings.items():
+                setattr(self._configuration, name, value)
+            try:
+                self.apply_settings()
+            except Exception as e:
+                logger.error(f"Could not retune device with {request.settings}: {e}")
+                for name, value in previous.items():
+                    setattr(self._configuration, name, value)
+                request.error = str(e)
+                try:
+                    self.recover_settings()
+                except Exception as e:
+                    logger.error(f"Could not restore device settings: {e}")
+                    self._running = False
+            else:
+                logger.info(f"Device retuned with: {self._configuration}")
+            request.done.set()
+
+    def set_block_sizer(self, block_sizer:BlockSizer) -> None:
+        self._block_sizer = block_sizer
+
+    def read_chunk_size(self) -> int:
+        if self._block_sizer is not None:
+            return self._block_sizer.chunk_size
+        return self._configuration.read_chunk_size
+
+    @property
+    def dropped_samples(self) -> int:
+        return self._dropped_samples
+
+    def count_samples(self, n_samples:int, sample_rate:float, check_drops:bool=True) -> Tuple[float, int]:
+        """Return the capture timestamp and index of the first sample of a block just read"""
+        # Wall clock only anchors the epoch, elapsed time must not follow clock adjustments
+        now:float = time.monotonic()
+        if self._start_epoch is None:
+            self._start_epoch = time.time() - n_samples / sample_rate
+            self._start_monotonic = now - n_samples / sample_rate
+        elif check_drops:
+            # More time has passed than the samples read account for, the device overran
+            gap:int = int((now - self._start_monotonic) * sample_rate) - (self._sample_count + n_samples)
+            if gap > self._configuration.drop_tolerance_s * sample_rate:
+                self._sample_count += gap
+                self._dropped_samples += gap
+                logger.warning(f"Dropped {gap} samples ({gap / sample_rate:.3f} s), {self._dropped_samples} dropped since start")
+        sample_index:int = self._sample_count
+        self._sample_count += n_samples
+        return self._start_epoch + sample_index / sample_rate, sample_index
+
     def run(self) -> None:
         pass
\ No newline at end of file
@@ -3,14 +3,16 @@
 import numpy as np
 import scipy.signal as signal
 import logging
-from sys import getsizeof
 from datetime import datetime, timedelta
+import time
 import queue
-from typing import Union
+from typing import Union, Dict, List
 
 from .configuration import FMDemodulatorConfiguration
-from .resources import SignalMetadata, AudioStruct, AudioMetadata, BandwidthSize
+from .resources import SignalMetadata, AudioStruct, AudioMetadata, BandwidthSize, TransmissionSegment
 from .demodulator import Demodulator
+from .agc import AGC
+from .ctcss import CTCSSDetector
 
 
 logger = logging.getLogger(__name__)
@@ -21,24 +23,59 @@ class FMDemodulator(Demodulator):
         super().__init__(configuration)
         self._configuration = configuration
         self._audio_rate = 44100
-        self._recorded_audio = []
-        self._start_chunk_time = datetime.now()
+        self._real_dtype:np.dtype = configuration.precision.real_dtype
+        self._complex_dtype:np.dtype = configuration.precision.complex_dtype
+        self._recorded_audio:List[np.array] = []
+        self._recorded_bytes:int = 0
+        self._recorded_samples:int = 0
+        self._segments:List[TransmissionSegment] = []
+        self._start_chunk_time:Union[datetime, None] = None
         self._max_queue_timeout_s = 1
+        self._current_metadata:Union[SignalMetadata, None] = None
+        self._agc = AGC(
+            self._audio_rate,
+            attack_s=configuration.agc_attack_s,
+            decay_s=configuration.agc_decay_s,
+            target=configuration.agc_target,
+            limit=configuration.agc_limit,
+        )
+        self._ctcss_detector = CTCSSDetector(threshold_db=configuration.ctcss_threshold_db, min_power_ratio=configuration.ctcss_min_power_ratio)
+        self._ctcss_filters:Dict[int, np.array] = {}
+        self._ctcss_zi:Union[np.array, None] = None
+        self._chunk_tone:Union[float, None] = None
     
     def setup(self) -> bool:
         logger.info("FM demodulator set up.")
         return True
 
     def _remove_ctcss(self, x:np.array, sample_rate:int) -> np.array:
-        # Low-pass filter below 300 Hz to extract CTCSS
-        b_ctcss, a_ctcss = signal.butter(4, 300 / (sample_rate / 2), btype='low')
-        # ctcss_tone = signal.filtfilt(b_ctcss, a_ctcss, x4)
-
-        # High-pass filter above 300 Hz to remove CTCSS from voice
-        b_voice, a_voice = signal.butter(4, 300 / (sample_rate / 2), btype='high')
-        y = signal.filtfilt(b_voice, a_voice, x)
+        # High-pass filter above 300 Hz to remove CTCSS from voice, designed once per rate
+        if sample_rate not in self._ctcss_filters:
+            self._ctcss_filters[sample_rate] = signal.butter(4, 300 / (sample_rate / 2), btype='high', output='sos').astype(self._real_dtype)
+        sos = self._ctcss_filters[sample_rate]
+        if self._ctcss_zi is None:
+            self._ctcss_zi = (signal.sosfilt_zi(sos) * x[0]).astype(self._real_dtype)
+        y, self._ctcss_zi = signal.sosfilt(sos, x, zi=self._ctcss_zi)
         return y
 
+    def _process_ctcss(self, x:np.array, sample_rate:int) -> Union[np.array, None]:
+        """Detect and remove CTCSS, None if the block must not be demodulated"""
+        allowed_tones = self._configuration.ctcss_tones
+        if self._configuration.detect_ctcss or len(allowed_tones) > 0:
+            tone = self._ctcss_detector.detect(x, sample_rate)
+            if len(allowed_tones) > 0 and (tone is None or not any(abs(tone - t) < 0.05 for t in allowed_tones)):
+                logger.info(f"CTCSS tone {tone} not in allowed tones {allowed_tones}, skipping")
+                return None
+            if tone is not None and tone != self._chunk_tone:
+                # Do not mix users of different tones in the same chunk
+                if self._chunk_tone is not None and self._current_metadata is not None:
+                    self.flush(self._current_metadata)
+                logger.info(f"CTCSS tone {tone} Hz detected")
+                self._chunk_tone = tone
+        if self._configuration.remove_ctcss:
+            x = self._remove_ctcss(x, sample_rate)
+        return x
+
     def _lowpass_filter(self, x:np.array, cutoff:int, fs:int, order:int=5):
             nyquist = 0.5 * fs  
             normal_cutoff = cutoff / nyquist  
@@ -51,7 +88,6 @@ class FMDemodulator(Demodulator):
         """
         # Select appropriate bandwidth for mode
         tau:float = 75e-6  # De-emphasis time constant (75µs for US, 50µs for EU)
-        audio_gain:int = 1000
 
         # Compute Decimation Rate
         dec_rate = int(sample_rate / (BandwidthSize.BROADCAST.value * 2))
@@ -65,16 +101,14 @@ class FMDemodulator(Demodulator):
 
         d = new_fs * tau  # -3dB point for de-emphasis
         x = np.exp(-1/d)
-        b = [1 - x]
-        a = [1, -x]
+        b = np.array([1 - x], dtype=self._real_dtype)
+        a = np.array([1, -x], dtype=self._real_dtype)
         x5 = signal.lfilter(b, a, x4)
 
         # Find a suitable decimation rate to get an audio rate of ~44-48 kHz
         dec_audio = int(new_fs / self._audio_rate)
         x6 = signal.decimate(x5, dec_audio, zero_phase=True)
 
-        # Scale audio for volume adjustment
-        x6 *= audio_gain / np.max(np.abs(x6))
         return x6
 
     def demodulate_fm_wide(self, x1: np.array, sample_rate: int):
@@ -91,31 +125,27 @@ class FMDemodulator(Demodulator):
         y4 = x3[1:] * np.conj(x3[:-1])
         x4 = np.angle(y4)
 
-        if self._configuration.remove_ctcss:
-            x4 = self._remove_ctcss(x4, new_fs)
+        x4 = self._process_ctcss(x4, new_fs)
+        if x4 is None:
+            return None
 
         tau:float = 75e-6  # De-emphasis time constant (75µs for US, 50µs for EU)
         d = new_fs * tau  # -3dB point for de-emphasis
         x = np.exp(-1/d)
-        b = [1 - x]
-        a = [1, -x]
+        b = np.array([1 - x], dtype=self._real_dtype)
+        a = np.array([1, -x], dtype=self._real_dtype)
         x5 = signal.lfilter(b, a, x4)
 
         # Find a suitable decimation rate to get an audio rate of ~44-48 kHz
         dec_audio = int(new_fs / self._audio_rate)
         x6 = signal.decimate(x5, dec_audio, zero_phase=True)
 
-        # Scale audio for volume adjustment
-        audio_gain:int = 1000
-        x6 *= audio_gain / np.max(np.abs(x6))
         return x6
 
     def demodulate_fm_narrow(self, x1: np.array, sample_rate: int):
         """
         Demodulate FM (NBFM) with proper filtering, decimation.
         """
-        audio_gain:int = 10000
-
         dec_rate = int(5)
         new_fs:int = int(sample_rate/dec_rate)
         x3 = signal.decimate(x1, dec_rate, zero_phase=True)
@@ -124,18 +154,20 @@ class FMDemodulator(Demodulator):
         y4 = x3[1:] * np.conj(x3[:-1])
         x4 = np.angle(y4)
 
-        if self._configuration.remove_ctcss:
-            x4 = self._remove_ctcss(x4, new_fs)
+        x4 = self._process_ctcss(x4, new_fs)
+        if x4 is None:
+            return None
 
         # Find a suitable decimation rate to get an audio rate of ~44-48 kHz
         dec_audio = int(new_fs / self._audio_rate)
         x5 = signal.decimate(x4, dec_audio, zero_phase=True)
 
-        # Scale audio for volume adjustment
-        x5 *= audio_gain / np.max(np.abs(x5))
         return x5
 
-    def time_window_has_passed(self, timestamp:int) -> bool:
+    def time_window_has_passed(self, timestamp:float) -> bool:
+        if self._start_chunk_time is None:
+            # Chunks are timed on sample timestamps, not on processing time
+            self._start_chunk_time = datetime.fromtimestamp(timestamp)
         return datetime.fromtimestamp(timestamp) - self._start_chunk_time > timedelta(seconds=self._configuration.max_delay_s)
 
     def demodulate(self, iq_samples:np.array, sample_rate:int, bandwidth:BandwidthSize) -> None:
@@ -144,34 +176,100 @@ class FMDemodulator(Demodulator):
             BandwidthSize.WIDE.name: self.demodulate_fm_wide,
             BandwidthSize.BROADCAST.name: self.demodulate_fm_broadcast,
         }
-        return demodulators[bandwidth.name](iq_samples, sample_rate)
+        return demodulators[bandwidth.name](np.asarray(iq_samples, dtype=self._complex_dtype), sample_rate)
+
+    def flush(self, metadata:SignalMetadata) -> None:
+        """Publish the accumulated audio and start a new chunk"""
+        if len(self._recorded_audio) > 0:
+            title:str = f"{metadata.frequency}_{metadata.bandwidth.name.lower()}"
+            if self._chunk_tone is not None:
+                title += f"_ctcss_{self._chunk_tone}"
+            self._recorded_audio = np.concatenate(self._recorded_audio)
+            self.publish(
+                AudioStruct(
+                    audio=self._recorded_audio,
+                    rate=int(self._audio_rate),
+                    metadata=AudioMetadata(
+                        title=title,
+                        ctcss_tone=self._chunk_tone,
+                        frequency=metadata.frequency,
+                        bandwidth=metadata.bandwidth,
+                        segments=self._segments,
+                    ),
+                )
+            )
+        self._recorded_audio = []
+        self._recorded_bytes = 0
+        self._recorded_samples = 0
+        self._segments = []
+        self._chunk_tone = None
+        self._start_chunk_time = None
+
+    def track_segment(self, start_time:float, end_time:float, sample_count:int, snr_db:float) -> None:
+        """Extend the current transmission with a block, or start a new one after a gap"""
+        if len(self._segments) > 0 and abs(self._segments[-1].end_time - start_time) < 1e-3:
+            segment = self._segments[-1]
+            segment.end_time = end_time
+            segment.sample_count += sample_count
+            segment.peak_snr_db = max(segment.peak_snr_db, float(snr_db))
+            return
+        self._segments.append(
+            TransmissionSegment(
+                start_time=start_time,
+                end_time=end_time,
+                sample_offset=self._recorded_samples,
+                sample_count=sample_count,
+                peak_snr_db=float(snr_db),
+            )
+        )
 
     def process_data(self, iq_samples:np.array, sample_rate:int, timestamp:int, metadata:SignalMetadata) -> None:
+        if self._current_metadata is not None and \
+            (self._current_metadata.frequency, self._current_metadata.bandwidth) != (metadata.frequency, metadata.bandwidth):
+            # Device was retuned, do not mix channels in the same chunk
+            logger.info(f"Channel changed from {self._current_metadata} to {metadata}")
+            self.flush(self._current_metadata)
+            self._agc.reset()
+            self._ctcss_detector.reset()
+            self._ctcss_zi = None
+        self._current_metadata = metadata
+
         snr_db: float = self.compute_snr(iq_samples, sample_rate, metadata.bandwidth)
         if not self.snr_threshold(snr_db):
             logger.warning(f"SNR not enough {snr_db} dB vs {self._configuration.snr_db} dB")
+            # Gap between transmissions, the next one must not be classified with this one's tone
+            self._ctcss_detector.reset()
+            self._ctcss_zi = None
             return
 
         audio_signal = self.demodulate(iq_samples, sample_rate, metadata.bandwidth)
-
-        self._recorded_audio.extend(audio_signal)
-
-        logger.info(f"Sample size {getsizeof(self._recorded_audio)} bytes.")
-
-        if len(self._recorded_audio) > 0 and \
-            (getsizeof(self._recorded_audio) > self._configuration.max_chunk_size_b or self.time_window_has_passed(timestamp)):
-            self._recorded_audio = self._recorded_audio / np.max(np.abs(self._recorded_audio)) * 0.9  # Scale to avoid clipping
-            self.publish(
+        if audio_signal is None:
+            return
+        audio_signal = self._agc.process(audio_signal)
+        if len(self._stream_queues) > 0:
+            self.publish_stream(
                 AudioStruct(
-                    audio=self._recorded_audio,
+                    audio=audio_signal,
                     rate=int(self._audio_rate),
                     metadata=AudioMetadata(
-                        title=f"{metadata.frequency}_{metadata.bandwidth.name.lower()}"
+                        title=f"{metadata.frequency}_{metadata.bandwidth.name.lower()}",
+                        ctcss_tone=self._chunk_tone,
+                        frequency=metadata.frequency,
+                        bandwidth=metadata.bandwidth,
                     ),
                 )
             )
-            self._recorded_audio = []
-            self._start_chunk_time = datetime.now()
+
+        self.track_segment(timestamp, timestamp + len(iq_samples) / sample_rate, len(audio_signal), snr_db)
+        self._recorded_audio.append(audio_signal)
+        self._recorded_bytes += audio_signal.nbytes
+        self._recorded_samples += len(audio_signal)
+
+        logger.info(f"Sample size {self._recorded_bytes} bytes.")
+
+        if len(self._recorded_audio) > 0 and \
+            (self._recorded_bytes > self._configuration.max_chunk_size_b or self.time_window_has_passed(timestamp)):
+            self.flush(metadata)
 
     def run(self) -> None:
         logger.info(f"Running FM demodulator with configuration {self._configuration}")
@@ -184,7 +282,10 @@ class FMDemodulator(Demodulator):
             except queue.Empty:
                 pass
             else:
+                start:float = time.perf_counter()
                 self.process_data(data.samples, data.sample_rate, data.timestamp, data.metadata)
+                if self._block_sizer is not None:
+                    self._block_sizer.report(len(data.samples), data.sample_rate, time.perf_counter() - start)
             finally:
                 pass
 
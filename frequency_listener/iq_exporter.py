@@ -8,7 +8,7 @@ from datetime import datetime
 
 from .exporter import Exporter
 from .configuration import ExporterConfiguration
-from .resources import SignalStruct
+from .resources import SignalStruct, TransmissionRecord
 
 logger = logging.getLogger(__name__)
 
@@ -57,4 +57,16 @@ class IQExporter(Exporter):
         else:
             logger.info(f"Exported IQs to file {filepath}")
             res = True
+            self.publish(
+                TransmissionRecord(
+                    kind="iq",
+                    path=filepath,
+                    frequency=data.metadata.frequency,
+                    bandwidth=data.metadata.bandwidth.name.lower(),
+                    start_time=data.timestamp,
+                    end_time=data.timestamp + len(data.samples) / data.sample_rate,
+                    byte_offset=0,
+                    byte_length=os.path.getsize(filepath),
+                )
+            )
         return res
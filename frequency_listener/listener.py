@@ -1,18 +1,25 @@
 #!/usr/bin/env python
 
+import math
 import logging
 
 import threading
 from queue import Queue
-from .configuration import DeviceConfiguration, DemodulatorConfiguration, ListenerConfiguration, ExporterConfiguration, FileExporterConfiguration
-from .resources import DemodulationType
+from .configuration import DeviceConfiguration, DemodulatorConfiguration, ListenerConfiguration, ExporterConfiguration, FileExporterConfiguration, NetworkExporterConfiguration
+from typing import Dict, Any, List, Union
+from .resources import DemodulationType, BandwidthSize
 from .fm_demodulator import FMDemodulator
 from .demodulator import Demodulator
 from .wav_exporter import WavExporter
 from .iq_exporter import IQExporter
+from .network_exporter import NetworkExporter
 from .device import Device
 from .sdr_device import SDRDevice
 from .virtual_device import VirtualDevice
+from .profiler import Profiler
+from .control_server import ControlServer
+from .block_sizer import BlockSizer
+from .transmission_index import TransmissionIndex
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +29,8 @@ class Listener(threading.Thread):
                     device_params:DeviceConfiguration, \
                     demodulator_params:DemodulatorConfiguration, \
                     exporter_params: ExporterConfiguration, \
-                    configuration:ListenerConfiguration):
+                    configuration:ListenerConfiguration, \
+                    network_params:Union[NetworkExporterConfiguration, None]=None):
         self._configuration:ListenerConfiguration = configuration
         self._demodulator_params:DemodulatorConfiguration = demodulator_params
         self._device:Device = None
@@ -35,6 +43,12 @@ class Listener(threading.Thread):
         self._audio_queue:Queue = Queue(maxsize=512)
         self._timer:threading.Timer = None
         self._iq_recorder:IQExporter = None
+        self._profiler:Profiler = None
+        self._control_server:ControlServer = None
+        self._network_params:Union[NetworkExporterConfiguration, None] = network_params
+        self._network_exporters:List[NetworkExporter] = []
+        self._index:TransmissionIndex = None
+        self._index_queue:Queue = Queue()
 
     def setup(self) -> bool:
         if self._device_params.virtual:
@@ -50,15 +64,67 @@ class Listener(threading.Thread):
         if self._demodulator_params.demodulation_type == DemodulationType.FM:
             self._demodulator:Demodulator = FMDemodulator(self._demodulator_params)
             self._demodulator.set_input_queue(self._device_queue)
-            self._demodulator.set_output_queue(self._audio_queue)
+            if self._configuration.export is True:
+                self._demodulator.set_output_queue(self._audio_queue)
 
         if self._configuration.export is True:
             self._exporter = WavExporter(self._exporter_params)
             self._exporter.set_input_queue(self._audio_queue)
 
+        if self._configuration.index_path is not None:
+            self._index = TransmissionIndex(self._configuration.index_path)
+            self._index.set_input_queue(self._index_queue)
+            if self._exporter is not None:
+                self._exporter.set_output_queue(self._index_queue)
+            if self._iq_recorder is not None:
+                self._iq_recorder.set_output_queue(self._index_queue)
+
+        if self._device_params.adaptive_chunk_size and self._demodulator is not None:
+            block_sizer = BlockSizer(
+                self._device_params.read_chunk_size,
+                self._device_params.min_read_chunk_size,
+                self._device_params.max_read_chunk_size,
+                target_load=self._device_params.target_load,
+            )
+            self._device.set_block_sizer(block_sizer)
+            self._demodulator.set_block_sizer(block_sizer)
+
+        if self._network_params is not None:
+            if self._demodulator is not None:
+                audio_stream_queue:Queue = Queue(maxsize=512)
+                audio_streamer = NetworkExporter(self._network_params, self._network_params.audio_port)
+                audio_streamer.set_input_queue(audio_stream_queue)
+                self._demodulator.set_stream_queue(audio_stream_queue)
+                self._network_exporters.append(audio_streamer)
+            if self._network_params.iq_port is not None:
+                iq_stream_queue:Queue = Queue(maxsize=512)
+                iq_streamer = NetworkExporter(self._network_params, self._network_params.iq_port)
+                iq_streamer.set_input_queue(iq_stream_queue)
+                self._device.set_output_queue(iq_stream_queue)
+                self._network_exporters.append(iq_streamer)
+
+        if self._configuration.control_socket is not None:
+            self._control_server = ControlServer(self._configuration.control_socket, self.handle_command)
+
         self._timer = threading.Timer(self._configuration.duration_s, self.teardown)
         logger.info(f"Listening during {self._configuration.duration_s} seconds.")
 
+        if self._configuration.profile_directory is not None:
+            self._profiler = Profiler(self._configuration.profile_directory)
+            self._profiler.attach("device", self._device)
+            if self._iq_recorder is not None:
+                self._profiler.attach("iq_exporter", self._iq_recorder)
+            if self._demodulator_params.demodulation_type == DemodulationType.FM:
+                self._profiler.attach("demodulator", self._demodulator)
+            if self._configuration.export is True:
+                self._profiler.attach("exporter", self._exporter)
+            if self._index is not None:
+                self._profiler.attach("transmission_index", self._index)
+            for i, network_exporter in enumerate(self._network_exporters):
+                self._profiler.attach(f"network_exporter_{i}", network_exporter)
+            self._profiler.attach("timer", self._timer)
+            logger.info(f"Profiling enabled, results in {self._configuration.profile_directory}")
+
         self._device.setup()
         if self._iq_recorder is not None:
             self._iq_recorder.setup()
@@ -69,8 +135,65 @@ class Listener(threading.Thread):
         if self._configuration.export is True:
             self._exporter.setup()
 
+        for network_exporter in self._network_exporters:
+            network_exporter.setup()
+
+        if self._index is not None:
+            self._index.setup()
+
+        if self._control_server is not None:
+            self._control_server.setup()
+
         return True
 
+    def handle_command(self, request:Dict[str, Any]) -> Dict[str, Any]:
+        """Apply a control command on the running pipeline"""
+        command:str = request["command"]
+        value = request.get("value")
+        if command == "status":
+            return {"ok": True, "status": self.status()}
+        if command == "set_frequency":
+            frequency:float = float(value)
+            if not self._device_params.min_frequency <= frequency <= self._device_params.max_frequency:
+                raise ValueError(f"Frequency {frequency} Hz out of range [{self._device_params.min_frequency}, {self._device_params.max_frequency}]")
+            settings = {"center_frequency": frequency}
+        elif command == "set_bandwidth":
+            bandwidths = [BandwidthSize.NARROW, BandwidthSize.WIDE, BandwidthSize.BROADCAST]
+            if str(value).upper() not in [bandwidth.name for bandwidth in bandwidths]:
+                raise ValueError(f"Bandwidth must be one of {[bandwidth.name.lower() for bandwidth in bandwidths]}")
+            settings = {"bandwidth": BandwidthSize[str(value).upper()]}
+        elif command == "set_gain":
+            gain = "auto" if value == "auto" else float(value)
+            if gain != "auto" and not math.isfinite(gain):
+                raise ValueError("Gain must be auto or a number of dB")
+            settings = {"gain": gain}
+        elif command == "set_snr_db":
+            self._demodulator.set_snr_db(float(value))
+            return {"ok": True}
+        else:
+            return {"ok": False, "error": f"Unknown command {command}"}
+        # Wait for the device to apply the settings between two reads
+        timeout_s:float = self._device.read_chunk_size() / self._device_params.sample_rate + 2.0
+        applied, error = self._device.retune(**settings, timeout_s=timeout_s)
+        if not applied:
+            return {"ok": False, "error": error}
+        # Blocks waiting to be demodulated belong to the previous tuning
+        if self._demodulator is not None:
+            self._demodulator.clear_input_queue()
+        return {"ok": True}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "center_frequency": self._device_params.center_frequency,
+            "bandwidth": self._device_params.bandwidth.name.lower(),
+            "gain": self._device_params.gain,
+            "snr_db": self._demodulator_params.snr_db,
+            "dropped_samples": self._device.dropped_samples,
+            "device_queue": self._device_queue.qsize(),
+            "iq_queue": self._iq_queue.qsize(),
+            "audio_queue": self._audio_queue.qsize(),
+        }
+
     def teardown(self) -> bool:
         self._device.quit()
         if self._demodulator_params.demodulation_type == DemodulationType.FM:
@@ -79,9 +202,15 @@ class Listener(threading.Thread):
             self._exporter.quit()
         if self._iq_recorder is not None:
             self._iq_recorder.quit()
+        for network_exporter in self._network_exporters:
+            network_exporter.quit()
+        if self._control_server is not None:
+            self._control_server.quit()
         return True
 
     def run(self) -> None:
+        if self._profiler is not None:
+            self._profiler.start()
         self._device.start()
         if self._demodulator_params.demodulation_type == DemodulationType.FM:
             self._demodulator.start()
@@ -89,6 +218,12 @@ class Listener(threading.Thread):
             self._exporter.start()
         if self._iq_recorder is not None:
             self._iq_recorder.start()
+        for network_exporter in self._network_exporters:
+            network_exporter.start()
+        if self._index is not None:
+            self._index.start()
+        if self._control_server is not None:
+            self._control_server.start()
         self._timer.start()
 
         if self._demodulator_params.demodulation_type == DemodulationType.FM:
@@ -98,3 +233,17 @@ class Listener(threading.Thread):
         if self._iq_recorder is not None:
             self._iq_recorder.join()
         self._device.join()
+        for network_exporter in self._network_exporters:
+            network_exporter.join()
+        if self._control_server is not None:
+            self._control_server.join()
+        if self._index is not None:
+            # Stopped once exporters are done, so their last records are indexed
+            self._index.quit()
+            self._index.join()
+
+        if self._profiler is not None:
+            self._timer.join()
+            self._profiler.teardown()
+            self._profiler.join()
+            self._profiler.dump()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+import queue
+import socket
+import logging
+import numpy as np
+from typing import Dict, List, Tuple, Union
+
+from .exporter import Exporter
+from .configuration import NetworkExporterConfiguration
+from .resources import AudioStruct, SignalStruct
+
+logger = logging.getLogger(__name__)
+
+class NetworkExporter(Exporter):
+    """Stream audio as PCM16 or IQ as complex64 to network subscribers"""
+    def __init__(self, configuration:NetworkExporterConfiguration, port:int) -> None:
+        super(NetworkExporter, self).__init__(configuration)
+        self._port:int = port
+        self._max_queue_timeout_s = 0.1
+        self._socket:socket.socket = None
+        # TCP subscriber -> part of the current block not sent yet
+        self._subscribers:Dict[socket.socket, Union[memoryview, None]] = {}
+        self._destinations:List[Tuple[str, int]] = []
+        self._dropped_blocks:int = 0
+        self._scaled:Union[np.array, None] = None
+        self._pcm:Union[np.array, None] = None
+
+    def setup(self) -> bool:
+        res:bool = False
+        try:
+            if self._configuration.protocol == "udp":
+                self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self._destinations = [(host, self._port) for host in self._configuration.udp_destinations]
+            else:
+                self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                self._socket.bind((self._configuration.host, self._port))
+                self._socket.listen()
+            self._socket.setblocking(False)
+        except Exception as e:
+            logger.error(f"Could not open network exporter on port {self._port}: {e}")
+            self._running = False
+        else:
+            logger.info(f"Network exporter streaming over {self._configuration.protocol} on port {self._port}")
+            res = True
+        return res
+
+    @property
+    def port(self) -> int:
+        return self._socket.getsockname()[1]
+
+    def pcm_buffer(self, n_samples:int) -> np.array:
+        """PCM buffer of a block, reused unless a subscriber still has part of the previous block to send"""
+        busy:bool = any(pending is not None for pending in self._subscribers.values())
+        if busy or self._pcm is None or len(self._pcm) < n_samples:
+            self._pcm = np.empty(n_samples, dtype="<i2")
+        return self._pcm[:n_samples]
+
+    def encode(self, data:Union[AudioStruct, SignalStruct]) -> memoryview:
+        """Convert a block once, the same buffer is shared by all subscribers"""
+        if isinstance(data, AudioStruct):
+            audio = np.asarray(data.audio)
+            if self._scaled is None or len(self._scaled) < len(audio) or self._scaled.dtype != audio.dtype:
+                self._scaled = np.empty(len(audio), dtype=audio.dtype)
+            scaled = self._scaled[:len(audio)]
+            np.multiply(audio, 32767, out=scaled)
+            np.clip(scaled, -32768, 32767, out=scaled)
+            pcm = self.pcm_buffer(len(audio))
+            pcm[:] = scaled
+            return memoryview(pcm).cast("B")
+        return memoryview(np.ascontiguousarray(data.samples, dtype="<c8")).cast("B")
+
+    def accept(self) -> None:
+        while True:
+            try:
+                connection, address = self._socket.accept()
+            except (BlockingIOError, OSError):
+                return
+            connection.setblocking(False)
+            self._subscribers[connection] = None
+            logger.info(f"New subscriber {address} on port {self._port}")
+
+    def drop(self, subscriber:socket.socket) -> None:
+        logger.info(f"Subscriber left port {self._port}")
+        del self._subscribers[subscriber]
+        subscriber.close()
+
+    def send_pending(self) -> None:
+        for subscriber, pending in list(self._subscribers.items()):
+            if pending is None:
+                continue
+            try:
+                sent = subscriber.send(pending)
+            except BlockingIOError:
+                continue
+            except OSError:
+                self.drop(subscriber)
+                continue
+            self._subscribers[subscriber] = pending[sent:] if sent < len(pending) else None
+
+    def stream(self, buffer:memoryview) -> None:
+        if self._configuration.protocol == "udp":
+            size:int = self._configuration.udp_payload_size
+            for destination in self._destinations:
+                for offset in range(0, len(buffer), size):
+                    try:
+                        self._socket.sendto(buffer[offset:offset + size], destination)
+                    except (BlockingIOError, OSError):
+                        self._dropped_blocks += 1
+                        break
+            return
+        for subscriber, pending in self._subscribers.items():
+            if pending is not None:
+                # Subscriber still busy with the previous block, skip this one
+                self._dropped_blocks += 1
+                logger.warning(f"Subscriber too slow on port {self._port}, {self._dropped_blocks} blocks dropped")
+                continue
+            self._subscribers[subscriber] = buffer
+        self.send_pending()
+
+    def run(self) -> None:
+        logger.info(f"Running network exporter")
+        while self._running:
+            if self._configuration.protocol != "udp":
+                self.accept()
+                self.send_pending()
+            try:
+                data = self._input_queue.get(
+                    block=self._running,
+                    timeout=self._max_queue_timeout_s,
+                )
+            except queue.Empty:
+                pass
+            else:
+                self.stream(self.encode(data))
+            finally:
+                pass
+
+    def quit(self) -> bool:
+        logger.info("Closing network exporter")
+        res = self.teardown()
+        for subscriber in list(self._subscribers):
+            subscriber.close()
+        self._subscribers = {}
+        if self._socket is not None:
+            self._socket.close()
+        return res
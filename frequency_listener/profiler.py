@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Callable, Tuple
+
+from .lf_thread import LFThread
+
+logger = logging.getLogger(__name__)
+
+class Profiler(LFThread):
+    """Sampling profiler, one collapsed stack profile per pipeline stage
+
+    The stack of every attached thread is read at a fixed interval, so each
+    stage gets its own profile whatever the Python version. Samples are taken
+    on the wall clock: time spent waiting on a queue shows up as well.
+    """
+    def __init__(self, output_directory:str, top:int=15, interval_s:float=0.005):
+        super().__init__()
+        self._output_directory:str = output_directory
+        self._top:int = top
+        self._interval_s:float = interval_s
+        self._stages:Dict[int, str] = {}
+        self._stacks:Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def attach(self, name:str, thread:threading.Thread) -> None:
+        """Profile the run method of a thread which has not been started yet"""
+        thread.run = self._wrap(name, thread.run)
+
+    def _wrap(self, name:str, function:Callable) -> Callable:
+        def profiled(*args, **kwargs):
+            ident:int = threading.get_ident()
+            with self._lock:
+                self._stages[ident] = name
+                self._stacks.setdefault(name, Counter())
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with self._lock:
+                    del self._stages[ident]
+        return profiled
+
+    @staticmethod
+    def label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def sample(self) -> None:
+        """Record the current stack of every attached thread"""
+        frames = sys._current_frames()
+        with self._lock:
+            for ident, name in self._stages.items():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    stack.append(self.label(frame))
+                    frame = frame.f_back
+                if len(stack) > 0:
+                    self._stacks[name][";".join(reversed(stack))] += 1
+
+    def run(self) -> None:
+        logger.info(f"Sampling pipeline stages every {self._interval_s} s")
+        while self._running:
+            self.sample()
+            time.sleep(self._interval_s)
+
+    def dump(self) -> bool:
+        """Write one .folded file per stage and log the hot functions"""
+        if not os.path.isdir(self._output_directory):
+            os.makedirs(self._output_directory)
+        with self._lock:
+            stacks = {name: Counter(counts) for name, counts in self._stacks.items()}
+        for name, counts in stacks.items():
+            filepath:str = os.path.join(self._output_directory, f"{name}.folded")
+            try:
+                with open(filepath, "w") as f:
+                    for stack, count in counts.most_common():
+                        f.write(f"{stack} {count}\n")
+            except Exception as e:
+                logger.error(f"Could not save profile of stage {name}: {e}")
+                continue
+            logger.info(f"Exported profile of stage {name} to file {filepath}")
+            logger.info(f"Top {self._top} functions of stage {name} by own samples:\n{self.summary(counts)}")
+        return True
+
+    def functions(self, counts:Counter) -> Tuple[Counter, Counter]:
+        """Own and cumulative sample counts of each function"""
+        own = Counter()
+        cumulative = Counter()
+        for stack, count in counts.items():
+            functions = stack.split(";")
+            own[functions[-1]] += count
+            for function in set(functions):
+                cumulative[function] += count
+        return own, cumulative
+
+    def summary(self, counts:Counter) -> str:
+        total:int = sum(counts.values())
+        if total == 0:
+            return "no samples"
+        own, cumulative = self.functions(counts)
+        lines = [f"{total} samples", f"{'own':>7} {'own%':>6} {'cum%':>6}  function"]
+        for function, count in own.most_common(self._top):
+            lines.append(f"{count:>7} {100 * count / total:>6.1f} {100 * cumulative[function] / total:>6.1f}  {function}")
+        return "\n".join(lines)
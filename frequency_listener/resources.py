@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 
 from enum import Enum
-from dataclasses import dataclass
+from typing import Union, List
+from dataclasses import dataclass, field
 import numpy as np
 
 class DemodulationType(Enum):
@@ -9,6 +10,18 @@ class DemodulationType(Enum):
     FM=1
     AM=2
 
+class Precision(Enum):
+    SINGLE="single"
+    DOUBLE="double"
+
+    @property
+    def real_dtype(self) -> np.dtype:
+        return np.dtype(np.float32 if self is Precision.SINGLE else np.float64)
+
+    @property
+    def complex_dtype(self) -> np.dtype:
+        return np.dtype(np.complex64 if self is Precision.SINGLE else np.complex128)
+
 class BandwidthSize(Enum):
     UNKNOWN=0
     WIDE=25000
@@ -19,6 +32,7 @@ class BandwidthSize(Enum):
 class SignalMetadata:
     frequency: int
     bandwidth: BandwidthSize
+    sample_index: int = 0
 
 @dataclass
 class SignalStruct:
@@ -27,9 +41,34 @@ class SignalStruct:
     timestamp: float
     metadata: SignalMetadata
 
+@dataclass
+class TransmissionSegment:
+    start_time: float
+    end_time: float
+    sample_offset: int
+    sample_count: int
+    peak_snr_db: float
+
 @dataclass
 class AudioMetadata:
     title: str
+    ctcss_tone: Union[float, None] = None
+    frequency: Union[float, None] = None
+    bandwidth: Union[BandwidthSize, None] = None
+    segments: List[TransmissionSegment] = field(default_factory=list)
+
+@dataclass
+class TransmissionRecord:
+    kind: str
+    path: str
+    frequency: float
+    bandwidth: str
+    start_time: float
+    end_time: float
+    byte_offset: int
+    byte_length: int
+    peak_snr_db: Union[float, None] = None
+    ctcss_tone: Union[float, None] = None
 
 @dataclass
 class AudioStruct:
@@ -5,7 +5,6 @@ import logging
 import rtlsdr
 import numpy as np
 from typing import Optional
-from datetime import datetime
 from .configuration import DeviceConfiguration
 from .resources import SignalStruct, SignalMetadata
 from .device import Device
@@ -32,17 +31,31 @@ class SDRDevice(Device):
             logger.info(f"Configuring device with: {self._configuration}")
             res = True
             self.sdr.sample_rate = self._configuration.sample_rate
-            self.sdr.center_freq = self._configuration.center_frequency+self._configuration.frequency_offset
-            self.sdr.gain = self._configuration.gain
-            self.sdr.bandwidth = int(self._configuration.bandwidth.value)
-            if self._configuration.frequency_correction_ppm > 0:
-                self.sdr.freq_correction = int(self._configuration.center_frequency * self._configuration.frequency_correction_ppm /1e6)
+            self.apply_settings()
             logger.info(f"{self.sdr}")
 
         finally:
             pass
         return res
 
+    def apply_settings(self) -> None:
+        self.sdr.center_freq = self._configuration.center_frequency+self._configuration.frequency_offset
+        self.sdr.gain = self._configuration.gain
+        self.sdr.bandwidth = int(self._configuration.bandwidth.value)
+        if self._configuration.frequency_correction_ppm > 0:
+            freq_correction:int = int(self._configuration.center_frequency * self._configuration.frequency_correction_ppm /1e6)
+            # the driver refuses to set an unchanged correction
+            if freq_correction != self.sdr.freq_correction:
+                self.sdr.freq_correction = freq_correction
+
+    def recover_settings(self) -> None:
+        # The driver closes the handle when a setting is refused
+        if not self.sdr.device_opened:
+            if not self.setup():
+                raise IOError("Could not reopen device")
+            return
+        self.apply_settings()
+
     def quit(self) -> bool:
         """Teardown"""
         logger.info("Closing SDR device")
@@ -52,15 +65,18 @@ class SDRDevice(Device):
         logger.info(f"Running SDR device")
 
         while self._running:
-            iq_samples = self.sdr.read_samples(self._configuration.read_chunk_size)
-            samples = np.array(iq_samples).astype("complex64")
+            self.apply_pending_settings()
+            iq_samples = self.sdr.read_samples(self.read_chunk_size())
+            samples = np.asarray(iq_samples, dtype=self._configuration.precision.complex_dtype)
+            timestamp, sample_index = self.count_samples(len(samples), self.sdr.sample_rate)
             data = SignalStruct(
                 samples=samples,
                 sample_rate=self.sdr.sample_rate,
-                timestamp=datetime.now().timestamp(),
+                timestamp=timestamp,
                 metadata=SignalMetadata(
                     frequency=self._configuration.center_frequency,
-                    bandwidth=self._configuration.bandwidth
+                    bandwidth=self._configuration.bandwidth,
+                    sample_index=sample_index,
                 )
             )
             self.publish(data)
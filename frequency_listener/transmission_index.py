@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+
+import os
+import time
+import queue
+import sqlite3
+import logging
+import argparse
+from contextlib import closing
+from datetime import datetime
+from dataclasses import astuple, fields
+from typing import List, Union
+
+from .lf_thread import LFThread
+from .resources import TransmissionRecord
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transmissions (
+    kind TEXT NOT NULL,
+    path TEXT NOT NULL,
+    frequency REAL NOT NULL,
+    bandwidth TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    byte_offset INTEGER NOT NULL,
+    byte_length INTEGER NOT NULL,
+    peak_snr_db REAL,
+    ctcss_tone REAL,
+    duration REAL GENERATED ALWAYS AS (end_time - start_time) VIRTUAL
+);
+CREATE INDEX IF NOT EXISTS transmissions_frequency_time ON transmissions (frequency, start_time);
+CREATE INDEX IF NOT EXISTS transmissions_time ON transmissions (start_time);
+"""
+
+COLUMNS = [f.name for f in fields(TransmissionRecord)]
+
+class TransmissionIndex(LFThread):
+    """Record exported files and transmissions in a SQLite database
+
+    Exporters publish TransmissionRecord to the input queue, rows are
+    inserted by batches from this thread so exporters never wait on disk.
+    """
+    def __init__(self, path:str, batch_size:int=64, max_delay_s:float=1.0):
+        super().__init__()
+        self._path:str = path
+        self._batch_size:int = batch_size
+        self._max_delay_s:float = max_delay_s
+        self._max_queue_timeout_s = 0.2
+        self._batch:List[TransmissionRecord] = []
+        self._batch_start:float = 0.0
+
+    def setup(self) -> bool:
+        res:bool = False
+        directory:str = os.path.dirname(self._path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        try:
+            with closing(sqlite3.connect(self._path)) as connection:
+                connection.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            logger.error(f"Could not open transmission index {self._path}: {e}")
+            self._running = False
+        else:
+            logger.info(f"Transmission index in {self._path}")
+            res = True
+        return res
+
+    def insert(self, connection:sqlite3.Connection) -> None:
+        if len(self._batch) == 0:
+            return
+        try:
+            with connection:
+                connection.executemany(
+                    f"INSERT INTO transmissions ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                    [astuple(record) for record in self._batch],
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Could not index {len(self._batch)} transmissions: {e}")
+        else:
+            logger.info(f"Indexed {len(self._batch)} transmissions")
+        self._batch = []
+
+    def add(self, record:TransmissionRecord) -> None:
+        if len(self._batch) == 0:
+            self._batch_start = time.monotonic()
+        self._batch.append(record)
+
+    def run(self) -> None:
+        logger.info("Running transmission index")
+        connection = sqlite3.connect(self._path)
+        while self._running:
+            try:
+                record = self._input_queue.get(
+                    block=self._running,
+                    timeout=self._max_queue_timeout_s,
+                )
+            except queue.Empty:
+                pass
+            else:
+                self.add(record)
+            finally:
+                if len(self._batch) >= self._batch_size or \
+                    (len(self._batch) > 0 and time.monotonic() - self._batch_start > self._max_delay_s):
+                    self.insert(connection)
+        # Records still queued at shutdown are kept
+        while not self._input_queue.empty():
+            self.add(self._input_queue.get(block=False))
+        self.insert(connection)
+        connection.close()
+
+    def quit(self) -> bool:
+        logger.info("Closing transmission index")
+        self._running = False
+        return True
+
+def query(path:str, frequency:Union[float, None]=None, tolerance:float=0.0, min_snr_db:Union[float, None]=None, \
+            since:Union[float, None]=None, until:Union[float, None]=None, kind:Union[str, None]=None) -> List[sqlite3.Row]:
+    """Return transmissions matching all given criteria, oldest first"""
+    conditions:List[str] = []
+    parameters:list = []
+    if frequency is not None:
+        conditions.append("frequency BETWEEN ? AND ?")
+        parameters += [frequency - tolerance, frequency + tolerance]
+    if min_snr_db is not None:
+        conditions.append("peak_snr_db >= ?")
+        parameters.append(min_snr_db)
+    if since is not None:
+        conditions.append("start_time >= ?")
+        parameters.append(since)
+    if until is not None:
+        conditions.append("start_time < ?")
+        parameters.append(until)
+    if kind is not None:
+        conditions.append("kind = ?")
+        parameters.append(kind)
+    where:str = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with closing(sqlite3.connect(path)) as connection:
+        connection.row_factory = sqlite3.Row
+        return connection.execute(
+            f"SELECT * FROM transmissions {where} ORDER BY start_time", parameters
+        ).fetchall()
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(description="Search recorded transmissions")
+    argparser.add_argument("-d", "--database", help="Path to the index, default output/index.sqlite", action="store", default=os.path.join("output", "index.sqlite"))
+    argparser.add_argument("-f", "--frequency", help="Frequency in Hz", action="store", type=float)
+    argparser.add_argument("-t", "--tolerance", help="Frequency tolerance in Hz, default 0", action="store", type=float, default=0.0)
+    argparser.add_argument("-s", "--min-snr", help="Minimum peak SNR in dB", action="store", type=float)
+    argparser.add_argument("--since", help="Start date, ISO format", action="store", type=datetime.fromisoformat)
+    argparser.add_argument("--until", help="End date, ISO format", action="store", type=datetime.fromisoformat)
+    argparser.add_argument("-k", "--kind", help="audio or iq", action="store", choices=["audio", "iq"])
+    args = argparser.parse_args()
+
+    rows = query(
+        args.database,
+        frequency=args.frequency,
+        tolerance=args.tolerance,
+        min_snr_db=args.min_snr,
+        since=args.since.timestamp() if args.since else None,
+        until=args.until.timestamp() if args.until else None,
+        kind=args.kind,
+    )
+    for row in rows:
+        snr:str = f"{row['peak_snr_db']:6.1f} dB" if row["peak_snr_db"] is not None else "      -  "
+        print(f"{datetime.fromtimestamp(row['start_time']):%Y-%m-%d %H:%M:%S} {row['duration']:8.2f} s "
+              f"{row['frequency']:12.0f} Hz {row['bandwidth']:9} {snr} {row['kind']:5} "
+              f"{row['path']}@{row['byte_offset']}+{row['byte_length']}")
@@ -5,7 +5,6 @@ import logging
 import numpy as np
 import pickle
 from pathlib import Path
-from datetime import datetime
 from .configuration import DeviceConfiguration
 from .resources import SignalStruct, SignalMetadata
 from .device import Device
@@ -37,14 +36,18 @@ class VirtualDevice(Device):
                 continue
             with open(collected_file, 'rb') as f:
                 logger.info(f"Loading {collected_file}")
-                x = pickle.load(f)
+                x = np.asarray(pickle.load(f), dtype=self._configuration.precision.complex_dtype)
+                self.apply_pending_settings()
+                # Files are read faster than real time, nothing to drop
+                timestamp, sample_index = self.count_samples(len(x), self._configuration.sample_rate, check_drops=False)
                 data = SignalStruct(
                     samples=x,
                     sample_rate=self._configuration.sample_rate,
-                    timestamp=datetime.now().timestamp(),
+                    timestamp=timestamp,
                     metadata=SignalMetadata(
                         frequency=self._configuration.center_frequency,
-                        bandwidth=self._configuration.bandwidth
+                        bandwidth=self._configuration.bandwidth,
+                        sample_index=sample_index,
                     )
                 )
                 self.publish(data)
@@ -9,6 +9,7 @@ from datetime import datetime
 
 from .exporter import Exporter
 from .configuration import ExporterConfiguration
+from .resources import AudioMetadata, TransmissionRecord
 
 logger = logging.getLogger(__name__)
 
@@ -23,11 +24,34 @@ class WavExporter(Exporter):
             os.mkdir(self._configuration.output_directory)
         return True
 
-    def write(self, content:np.array, rate:int, title:str) -> bool:
+    def write(self, content:np.array, rate:int, title:str, metadata:AudioMetadata=None) -> bool:
         date = datetime.now().strftime("%Y-%m-%d__%H_%M_%S")
         filepath: str = f"audio_{title}_{date}.wav"
         logger.info(f"Exporting audio to file {filepath}")
-        sf.write(os.path.join(self._configuration.output_directory, filepath), content, rate)
+        sf.write(os.path.join(self._configuration.output_directory, filepath), content, rate, subtype="PCM_16")
+        if metadata is not None:
+            self.index(os.path.join(self._configuration.output_directory, filepath), len(content), metadata)
+        return True
+
+    def index(self, filepath:str, frames:int, metadata:AudioMetadata) -> None:
+        """Publish one record per transmission of the file"""
+        sample_width:int = 2
+        header:int = os.path.getsize(filepath) - frames * sample_width
+        for segment in metadata.segments:
+            self.publish(
+                TransmissionRecord(
+                    kind="audio",
+                    path=filepath,
+                    frequency=metadata.frequency,
+                    bandwidth=metadata.bandwidth.name.lower(),
+                    start_time=segment.start_time,
+                    end_time=segment.end_time,
+                    byte_offset=header + segment.sample_offset * sample_width,
+                    byte_length=segment.sample_count * sample_width,
+                    peak_snr_db=segment.peak_snr_db,
+                    ctcss_tone=metadata.ctcss_tone,
+                )
+            )
 
     def run(self) -> None:
         logger.info(f"Running Exporter")
@@ -40,7 +64,7 @@ class WavExporter(Exporter):
             except queue.Empty:
                 pass
             else:
-                self.write(samples.audio, samples.rate, samples.metadata.title)
+                self.write(samples.audio, samples.rate, samples.metadata.title, samples.metadata)
             finally:
                 pass
 
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+
+import time
+import numpy as np
+
+from frequency_listener.configuration import FMDemodulatorConfiguration
+from frequency_listener.fm_demodulator import FMDemodulator
+from frequency_listener.resources import BandwidthSize, SignalMetadata
+
+SAMPLE_RATE = 1200000
+BLOCK_SIZE = 16384
+
+def nbfm_blocks(tone:float, seconds:float, start:int=0) -> list:
+    t = (np.arange(int(SAMPLE_RATE * seconds)) + start) / SAMPLE_RATE
+    message = np.sin(2 * np.pi * 1000 * t) + 0.15 * np.sin(2 * np.pi * tone * t)
+    iq = np.exp(1j * 2 * np.pi * 2500 * np.cumsum(message) / SAMPLE_RATE).astype(np.complex64)
+    return [iq[i:i + BLOCK_SIZE] for i in range(0, len(iq) - BLOCK_SIZE + 1, BLOCK_SIZE)]
+
+def test_tone_of_previous_transmission_is_forgotten_after_a_gap():
+    demodulator = FMDemodulator(FMDemodulatorConfiguration(
+        snr_db=10, max_delay_s=1000, max_chunk_size_b=10**12, ctcss_tones=[88.5],
+    ))
+    metadata = SignalMetadata(145500000, BandwidthSize.NARROW)
+    for block in nbfm_blocks(88.5, 1.5):
+        demodulator.process_data(block, SAMPLE_RATE, time.time(), metadata)
+    assert demodulator._recorded_samples > 0
+    allowed_samples = demodulator._recorded_samples
+
+    rng = np.random.default_rng(0)
+    noise = (rng.standard_normal(BLOCK_SIZE) + 1j * rng.standard_normal(BLOCK_SIZE)).astype(np.complex64)
+    demodulator.process_data(noise, SAMPLE_RATE, time.time(), metadata)
+
+    for block in nbfm_blocks(123.0, 0.6):
+        demodulator.process_data(block, SAMPLE_RATE, time.time(), metadata)
+    assert demodulator._recorded_samples == allowed_samples
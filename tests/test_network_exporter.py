@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+import time
+import queue
+import socket
+import numpy as np
+import pytest
+
+from frequency_listener.configuration import NetworkExporterConfiguration
+from frequency_listener.network_exporter import NetworkExporter
+from frequency_listener.resources import AudioStruct, AudioMetadata
+
+def audio_block(n_samples:int, seed:int) -> AudioStruct:
+    rng = np.random.default_rng(seed)
+    return AudioStruct(audio=rng.uniform(-1.2, 1.2, n_samples).astype(np.float32), rate=44100, metadata=AudioMetadata(title="test"))
+
+def pcm16(block:AudioStruct) -> bytes:
+    return np.clip(block.audio * 32767, -32768, 32767).astype("<i2").tobytes()
+
+def wait_for(condition, timeout_s:float=5) -> bool:
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def receive(connection:socket.socket, n_bytes:int) -> bytes:
+    data = b""
+    while len(data) < n_bytes:
+        chunk = connection.recv(n_bytes - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+@pytest.fixture
+def exporter():
+    # Port 0 lets the system pick a free port
+    exporter = NetworkExporter(NetworkExporterConfiguration(protocol="tcp"), 0)
+    exporter.set_input_queue(queue.Queue())
+    assert exporter.setup()
+    exporter.start()
+    yield exporter
+    exporter.quit()
+    exporter.join()
+
+def test_tcp_subscribers_receive_the_same_pcm16(exporter:NetworkExporter):
+    subscribers = [socket.create_connection(("127.0.0.1", exporter.port)) for _ in range(2)]
+    assert wait_for(lambda: len(exporter._subscribers) == 2)
+    blocks = [audio_block(n, seed) for seed, n in enumerate([4410, 20000, 17])]
+    for block in blocks:
+        exporter._input_queue.put(block)
+    expected = b"".join(pcm16(block) for block in blocks)
+    for subscriber in subscribers:
+        subscriber.settimeout(5)
+        assert receive(subscriber, len(expected)) == expected
+        subscriber.close()
+    assert exporter._dropped_blocks == 0
+
+def test_tcp_subscriber_not_reading_drops_blocks_without_blocking(exporter:NetworkExporter):
+    subscriber = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    subscriber.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    subscriber.connect(("127.0.0.1", exporter.port))
+    assert wait_for(lambda: len(exporter._subscribers) == 1)
+    for seed in range(50):
+        exporter._input_queue.put(audio_block(441000, seed))
+    assert wait_for(lambda: exporter._input_queue.empty())
+    assert exporter._dropped_blocks > 0
+    subscriber.close()
+
+def test_tcp_slow_subscriber_receives_whole_blocks(exporter:NetworkExporter):
+    subscriber = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    subscriber.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    subscriber.connect(("127.0.0.1", exporter.port))
+    assert wait_for(lambda: len(exporter._subscribers) == 1)
+    blocks = [pcm16(audio_block(100000, seed)) for seed in range(20)]
+    for seed in range(len(blocks)):
+        exporter._input_queue.put(audio_block(100000, seed))
+    assert wait_for(lambda: exporter._input_queue.empty())
+    subscriber.settimeout(0.5)
+    data = b""
+    while True:
+        try:
+            chunk = subscriber.recv(65536)
+        except socket.timeout:
+            break
+        if not chunk:
+            break
+        data += chunk
+    subscriber.close()
+    # Skipped blocks are missing entirely, the others arrive intact and in order
+    offset = 0
+    for block in blocks:
+        if data.startswith(block, offset):
+            offset += len(block)
+    assert offset == len(data)
+    assert 0 < len(data) < sum(len(block) for block in blocks)
+
+def test_udp_destination_receives_pcm16():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(5)
+    exporter = NetworkExporter(NetworkExporterConfiguration(protocol="udp", udp_destinations=["127.0.0.1"]), receiver.getsockname()[1])
+    exporter.set_input_queue(queue.Queue())
+    assert exporter.setup()
+    exporter.start()
+    try:
+        block = audio_block(3000, 0)
+        exporter._input_queue.put(block)
+        expected = pcm16(block)
+        data = b""
+        while len(data) < len(expected):
+            datagram = receiver.recv(65536)
+            assert len(datagram) <= exporter._configuration.udp_payload_size
+            data += datagram
+        assert data == expected
+    finally:
+        exporter.quit()
+        exporter.join()
+        receiver.close()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+import numpy as np
+import pytest
+
+from frequency_listener.agc import AGC
+from frequency_listener.configuration import FMDemodulatorConfiguration
+from frequency_listener.fm_demodulator import FMDemodulator
+from frequency_listener.resources import BandwidthSize, Precision
+
+SAMPLE_RATE = 1200000
+
+def fm_signal(deviation:float, seconds:float=0.5) -> np.array:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    message = np.sin(2 * np.pi * 1000 * t) + 0.5 * np.sin(2 * np.pi * 2300 * t)
+    iq = np.exp(1j * 2 * np.pi * deviation * np.cumsum(message) / SAMPLE_RATE)
+    return iq + 0.05 * (rng.standard_normal(len(t)) + 1j * rng.standard_normal(len(t)))
+
+def demodulate(iq:np.array, bandwidth:BandwidthSize, precision:Precision) -> np.array:
+    demodulator = FMDemodulator(FMDemodulatorConfiguration(precision=precision))
+    agc = AGC(44100)
+    blocks = np.array_split(iq.astype(precision.complex_dtype), 3)
+    return np.concatenate([agc.process(demodulator.demodulate(block, SAMPLE_RATE, bandwidth)) for block in blocks])
+
+@pytest.mark.parametrize("bandwidth, deviation", [
+    (BandwidthSize.NARROW, 2500),
+    (BandwidthSize.WIDE, 5000),
+    (BandwidthSize.BROADCAST, 75000),
+])
+def test_single_precision_matches_double(bandwidth:BandwidthSize, deviation:float):
+    iq = fm_signal(deviation)
+    single = demodulate(iq, bandwidth, Precision.SINGLE)
+    double = demodulate(iq, bandwidth, Precision.DOUBLE)
+    assert single.dtype == np.float32
+    assert double.dtype == np.float64
+    assert single.shape == double.shape
+    # Well under the 0.9 full scale, about a dozen PCM16 steps
+    assert np.max(np.abs(single - double)) < 1e-3
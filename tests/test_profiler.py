@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+
+import os
+import time
+import threading
+
+from frequency_listener.profiler import Profiler
+
+def busy_a(stop:threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+def busy_b(stop:threading.Event) -> None:
+    while not stop.is_set():
+        sorted(range(1000))
+
+def test_each_stage_only_holds_its_own_stacks(tmp_path):
+    profiler = Profiler(str(tmp_path), interval_s=0.001)
+    stop = threading.Event()
+    threads = {"a": threading.Thread(target=busy_a, args=(stop,)), "b": threading.Thread(target=busy_b, args=(stop,))}
+    for name, thread in threads.items():
+        profiler.attach(name, thread)
+    profiler.start()
+    for thread in threads.values():
+        thread.start()
+    time.sleep(0.3)
+    stop.set()
+    for thread in threads.values():
+        thread.join()
+    profiler.teardown()
+    profiler.join()
+    profiler.dump()
+
+    for name, other in (("a", "b"), ("b", "a")):
+        with open(os.path.join(tmp_path, f"{name}.folded")) as f:
+            lines = f.read().splitlines()
+        assert len(lines) > 0
+        assert all(f"busy_{name} (" in line for line in lines)
+        assert not any(f"busy_{other} (" in line for line in lines)